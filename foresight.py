@@ -1,7 +1,18 @@
 """
 foresight.py
 
-A user-friendly line-based menu for HeinSight with 13 menu options/features, including:
+A user-friendly line-based menu for HeinSight. The main menu has 5 options:
+ 1) Setup & Run Detection - input file / camera / stream URL, output
+    directory, thresholds, auto-open, run
+ 2) Overlays & Thresholds - T/C/V overlay, side-by-side, font scale, top-left
+    summary, color patch, debouncing, per-class and T/C/V visibility,
+    frame / detection / T/C sampling strides
+ 3) HeinSight Management - heinsight directory, model reload, CPU only,
+    batch size, TensorRT FP16 engines, vessel input size, FFmpeg backend
+ 4) Display Current Configuration
+ 5) Quit
+
+Features include:
  1. Per-class bounding box/label toggles: Vessel, Solid, Residue, Empty, Homo, Hetero
  2. Per-metric toggles for T (turbidity), C (color/hue), V (volume fraction)
  3. Optional color patch for measured hue
@@ -14,30 +25,62 @@ A user-friendly line-based menu for HeinSight with 13 menu options/features, inc
 10. Thresholds for T/C/V + detection confidence
 11. Dynamic import of 'heinsight'
 12. No CSV logs: bounding boxes + overlays in final media only
-13. Ability to pick input file / output directory for detection
+13. Ability to pick input file (or camera / stream) / output directory for detection
 
 Author: ChatGPT (prompted by user)
 """
 
 import sys
 import os
-import traceback
-import subprocess
-import tkinter as tk
-from tkinter import filedialog, messagebox
-
-import cv2
-import numpy as np
+import queue
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+# OpenCV / NumPy are heavy to import and only needed once detection runs,
+# so they are bound lazily by _load_vision_libs().
+cv2 = None
+np = None
+
+# OpenCV and torch each default to one thread per core; split the cores
+# between them so decode/overlay and YOLO don't oversubscribe the CPU.
+# OMP_NUM_THREADS must be set before torch is imported (via HeinSight).
+CV_THREADS = max(1, (os.cpu_count() or 2) // 2)
+os.environ.setdefault("OMP_NUM_THREADS", str(CV_THREADS))
 
 # ----- COLORAMA for colored text in terminal -----
+# Only color a real terminal: when output is piped or redirected, ctext()
+# returns plain text and colorama's stream wrapping is skipped altogether.
 try:
     import colorama
     from colorama import Fore, Style
-    colorama.init(autoreset=True)
-    COLORAMA_AVAILABLE = True
+    COLORAMA_AVAILABLE = sys.stdout.isatty()
+    if COLORAMA_AVAILABLE:
+        colorama.init(autoreset=True)
 except ImportError:
     COLORAMA_AVAILABLE = False
 
+    class _NoColor:
+        """Stand-in for colorama's Fore/Style; ctext() ignores the values."""
+        def __getattr__(self, name):
+            return ""
+
+    Fore = Style = _NoColor()
+
+
+def _load_vision_libs():
+    """
+    Import OpenCV and NumPy on first use and bind them as module globals.
+    """
+    global cv2, np
+    if cv2 is None:
+        import cv2 as _cv2
+        import numpy as _np
+        _cv2.setUseOptimized(True)
+        _cv2.setNumThreads(CV_THREADS)
+        cv2, np = _cv2, _np
+
 
 def ctext(text, color=None, style=None):
     """
@@ -47,6 +90,12 @@ def ctext(text, color=None, style=None):
     """
     if not COLORAMA_AVAILABLE or (not color and not style):
         return text
+    return _colored(text, color, style)
+
+
+@lru_cache(maxsize=512)
+def _colored(text, color, style):
+    # Menus redraw the same few strings over and over; build each once
     prefix = ""
     if style:
         prefix += style
@@ -56,6 +105,23 @@ def ctext(text, color=None, style=None):
     return f"{prefix}{text}{suffix}"
 
 
+ON_OFF = ("OFF", "ON")    # indexed by a bool toggle
+
+# Colored "N) " prefixes for menu options; index 0 is unused
+MENU_NUMBERS = tuple(ctext(f"{num}) ", color=Fore.YELLOW) for num in range(16))
+
+
+def print_menu(title, options):
+    """
+    Print a submenu header and its numbered options with a single write.
+    """
+    lines = [ctext(f"\n=== {title} ===", color=Fore.GREEN, style=Style.BRIGHT)]
+    for num, option in enumerate(options, 1):
+        lines.append(MENU_NUMBERS[num] + option)
+    lines.append("")
+    sys.stdout.write("\n".join(lines))
+
+
 # -------------------------------------------------------------------------
 #  FIRST: Force selection of the "heinsight4.0" folder and verify structure
 # -------------------------------------------------------------------------
@@ -64,6 +130,124 @@ HeinSight = None           # The actual class from heinsight.py
 heinsight_obj = None       # HeinSight instance
 heinsight_module_available = False
 
+_tk_root = None            # Hidden Tk root shared by every dialog (see get_tk_root)
+
+def get_tk_root():
+    """
+    Return a hidden Tk root, created on first use and then reused for every
+    dialog, since initializing Tcl/Tk is the slow part of opening one.
+    """
+    global _tk_root
+    if _tk_root is None:
+        import atexit
+        import tkinter as tk
+        _tk_root = tk.Tk()
+        _tk_root.withdraw()
+        atexit.register(_tk_root.destroy)
+    return _tk_root
+
+# Last directory used by each dialog, persisted across runs in STATE_FILE
+STATE_FILE = os.path.join(os.path.expanduser("~"), ".foresight_state.json")
+last_dialog_dirs = {"heinsight": None, "input": None, "output": None}
+
+def load_dialog_state():
+    """
+    Restore the last-used dialog directories from STATE_FILE (if present).
+    """
+    import json
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return
+    saved_dirs = saved.get("last_dirs", {}) if isinstance(saved, dict) else {}
+    for key in last_dialog_dirs:
+        d = saved_dirs.get(key)
+        if isinstance(d, str) and os.path.isdir(d):
+            last_dialog_dirs[key] = d
+
+def remember_dialog_dir(key, directory):
+    """
+    Record the directory a dialog ended in and persist it to STATE_FILE.
+    """
+    import json
+    last_dialog_dirs[key] = directory
+    try:
+        with open(STATE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"last_dirs": last_dialog_dirs}, f, indent=2)
+    except OSError:
+        pass  # remembering the folder is a convenience, never an error
+
+def dialog_initial_dir(key):
+    return last_dialog_dirs[key] or os.path.expanduser("~")
+
+def ask_path(prompt, title, initial_dir, directory=False, filetypes=None):
+    """
+    Show a file picker (or a folder picker with directory=True) and return
+    the chosen path, or "" if cancelled. On Linux the desktop's own picker
+    (zenity/kdialog) is used when installed, which also skips loading Tk;
+    otherwise Tk's dialog, already the native one on Windows and macOS.
+    `filetypes` uses Tk's [(name, "*.a *.b"), ...] format.
+    """
+    if sys.platform.startswith("linux"):
+        chosen = _ask_path_linux(title, initial_dir, directory, filetypes)
+        if chosen is not None:
+            return chosen
+
+    from tkinter import filedialog, messagebox
+    root = get_tk_root()
+    messagebox.showinfo("Foresight", prompt)
+    if directory:
+        chosen = filedialog.askdirectory(title=title, initialdir=initial_dir)
+    else:
+        chosen = filedialog.askopenfilename(title=title, initialdir=initial_dir,
+                                            filetypes=filetypes or [])
+    root.update()  # let the closed dialog disappear
+    return chosen
+
+def _ask_path_linux(title, initial_dir, directory, filetypes):
+    """
+    Run zenity or kdialog for ask_path(). Returns the path, "" if the user
+    cancelled, or None if neither tool is installed or could open a window.
+    """
+    import shutil
+    import subprocess
+    if shutil.which("zenity"):
+        cmd = ["zenity", "--file-selection", "--title", title,
+               "--filename", os.path.join(initial_dir, "")]
+        if directory:
+            cmd.append("--directory")
+        for name, patterns in filetypes or []:
+            cmd += ["--file-filter", f"{name} | {patterns}"]
+    elif shutil.which("kdialog"):
+        cmd = ["kdialog", "--title", title]
+        if directory:
+            cmd += ["--getexistingdirectory", initial_dir]
+        else:
+            cmd += ["--getopenfilename", initial_dir,
+                    "\n".join(f"{patterns}|{name}" for name, patterns in filetypes or [])]
+    else:
+        return None
+    try:
+        result = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, text=True)
+    except OSError:
+        return None
+    if result.returncode == 0:
+        return result.stdout.strip()
+    if result.returncode == 1:
+        return ""      # cancelled
+    return None        # no display or other failure: fall back to Tk
+
+def prepend_sys_path(path):
+    """
+    Put `path` at the front of sys.path, removing any earlier entry for it,
+    so picking the same folder again does not keep growing the import path.
+    """
+    while path in sys.path:
+        sys.path.remove(path)
+    sys.path.insert(0, path)
+
 def enforce_heinsight_directory():
     """
     Force the user to select the folder containing 'heinsight4.0',
@@ -71,16 +255,15 @@ def enforce_heinsight_directory():
     """
     global heinsight_dir
 
-    # Use tkinter to pick the "heinsight4.0" folder
-    root = tk.Tk()
-    root.withdraw()
-    messagebox.showinfo("Foresight", "Select the 'heinsight4.0' folder.")
-    chosen_dir = filedialog.askdirectory(title="Select HeinSight Root Folder (heinsight4.0)")
-    root.destroy()
+    # Pick the "heinsight4.0" folder
+    chosen_dir = ask_path("Select the 'heinsight4.0' folder.",
+                          "Select HeinSight Root Folder (heinsight4.0)",
+                          dialog_initial_dir("heinsight"), directory=True)
 
     if not chosen_dir or not os.path.isdir(chosen_dir):
         print(ctext("ERROR: No valid 'heinsight4.0' directory selected.", color=Fore.RED))
         sys.exit(1)
+    remember_dialog_dir("heinsight", chosen_dir)
 
     # we expect a subfolder: chosen_dir/heinsight/heinsight.py
     sub_heinsight = os.path.join(chosen_dir, "heinsight")
@@ -93,7 +276,7 @@ def enforce_heinsight_directory():
     # Looks good => store that subfolder in a global
     heinsight_dir = sub_heinsight
     # Insert at front of sys.path so Python sees it first
-    sys.path.insert(0, heinsight_dir)
+    prepend_sys_path(heinsight_dir)
     print(ctext(f"HeinSight folder set to: {heinsight_dir}", color=Fore.GREEN))
 
 
@@ -134,6 +317,13 @@ annotation_font_scale = 0.6        # Font scale for bounding-box labels
 show_top_left_list = False         # If True, show a text summary of boxes at top-left
 show_color_patch = False           # If True, draw a color patch for hue
 debounce_enabled = False           # If True, apply T/C/V debouncing (3-frame rule)
+frame_stride = 1                   # Process only every Nth video frame (1 = every frame)
+detect_stride = 1                  # Run YOLO on every Nth processed frame; reuse boxes in between
+tcv_sample_stride = 1              # Measure T/C on every Nth pixel row/column of a liquid box (1 = all)
+ffmpeg_backend = False             # If True, decode/encode video through ffmpeg pipes (HW codecs)
+inference_batch_size = 8           # Frames/crops per YOLO predict() call (0 = auto)
+use_tensorrt_engines = False       # If True, run the YOLO models as cached TensorRT FP16 engines
+vessel_imgsz = 0                   # Vessel-model input size in px (0 = model default)
 
 # Per-class bounding box/label toggles
 show_label_vessel = True
@@ -148,27 +338,42 @@ show_metric_t = True  # Turbidity
 show_metric_c = True  # Color/Hue
 show_metric_v = True  # Volume Fraction
 
-IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+IMAGE_EXTS = frozenset({".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"})
 
 # For storing bounding-box strings from the last processed frame
 last_frame_bboxes = []
-# For debouncing T/C/V across frames in a video
+# For debouncing T/C/V across frames in a video. A value is shown on the
+# first frame it passes its threshold and held until it has failed it for
+# DEBOUNCE_WINDOW consecutive frames.
+DEBOUNCE_WINDOW = 3
 debounce_map = {}
 
 # --- ADDED FOR CPU-ONLY TOGGLE ---
 cpu_only_inference = False  # Whether to force CPU-only inference
 
+# Background thread that loads + warms up the YOLO models at launch. It
+# never prints (the user is typing at the menu prompt meanwhile); its
+# messages are queued in _warmup_messages and shown by report_model_warmup().
+_warmup_thread = None
+_warmup_messages = []
+
 
 def main():
     """
     Main entry point after HeinSight is confirmed to be imported.
     We show a hierarchical menu with submenus.
     """
+    global _warmup_thread
+    # Load the models while the user is still navigating the menus
+    _warmup_thread = threading.Thread(target=warm_start_models, daemon=True)
+    _warmup_thread.start()
+
     print(ctext("=== Foresight Terminal Menu ===", color=Fore.CYAN, style=Style.BRIGHT))
     print("Offers a line-based menu for controlling HeinSight detection with advanced overlays, "
           "side-by-side output, annotation font adjustments, T/C/V debouncing, per-class toggles, etc.\n")
 
     while True:
+        report_model_warmup()
         show_main_menu()
         choice = input(ctext("Enter your choice: ", color=Fore.YELLOW)).strip()
         if choice == "1":
@@ -190,15 +395,24 @@ def main():
 #   TOP-LEVEL MENU
 # =============================================================================
 
+# The main menu has no state-dependent lines, so it is built once
+MAIN_MENU = "\n".join([
+    ctext("\n---------------------------------------", color=Fore.CYAN),
+    ctext("Foresight Main Menu - Choose an option:", color=Fore.GREEN),
+    *(MENU_NUMBERS[num] + option for num, option in enumerate([
+        "Setup & Run Detection",
+        "Overlays & Thresholds",
+        "HeinSight Management",
+        "Display Current Configuration",
+        "Quit",
+    ], 1)),
+    ctext("---------------------------------------", color=Fore.CYAN),
+    "",
+])
+
+
 def show_main_menu():
-    print(ctext("\n---------------------------------------", color=Fore.CYAN))
-    print(ctext("Foresight Main Menu - Choose an option:", color=Fore.GREEN))
-    print(ctext("1) ", color=Fore.YELLOW) + "Setup & Run Detection")
-    print(ctext("2) ", color=Fore.YELLOW) + "Overlays & Thresholds")
-    print(ctext("3) ", color=Fore.YELLOW) + "HeinSight Management")
-    print(ctext("4) ", color=Fore.YELLOW) + "Display Current Configuration")
-    print(ctext("5) ", color=Fore.YELLOW) + "Quit")
-    print(ctext("---------------------------------------", color=Fore.CYAN))
+    sys.stdout.write(MAIN_MENU)
 
 
 # =============================================================================
@@ -207,13 +421,14 @@ def show_main_menu():
 
 def submenu_setup_and_run():
     while True:
-        print(ctext("\n=== Setup & Run Detection ===", color=Fore.GREEN, style=Style.BRIGHT))
-        print(ctext("1) ", color=Fore.YELLOW) + f"Pick Input File (current: {input_file if input_file else 'NONE'})")
-        print(ctext("2) ", color=Fore.YELLOW) + f"Pick Output Directory (current: {output_dir if output_dir else 'NONE'})")
-        print(ctext("3) ", color=Fore.YELLOW) + "Set or Update Thresholds (turb, color, volume, confidence)")
-        print(ctext("4) ", color=Fore.YELLOW) + f"Toggle Auto-Open Output (currently: {'ON' if auto_open_output else 'OFF'})")
-        print(ctext("5) ", color=Fore.YELLOW) + "Run Detection")
-        print(ctext("6) ", color=Fore.YELLOW) + "Return to Main Menu")
+        print_menu("Setup & Run Detection", [
+            f"Pick Input File (current: {input_file if input_file else 'NONE'})",
+            f"Pick Output Directory (current: {output_dir if output_dir else 'NONE'})",
+            "Set or Update Thresholds (turb, color, volume, confidence)",
+            f"Toggle Auto-Open Output (currently: {ON_OFF[auto_open_output]})",
+            "Run Detection",
+            "Return to Main Menu",
+        ])
 
         choice = input(ctext("Enter your choice: ", color=Fore.YELLOW)).strip()
         if choice == "1":
@@ -238,16 +453,20 @@ def submenu_setup_and_run():
 
 def submenu_overlays_and_thresholds():
     while True:
-        print(ctext("\n=== Overlays & Thresholds ===", color=Fore.GREEN, style=Style.BRIGHT))
-        print(ctext("1) ", color=Fore.YELLOW) + f"Toggle Advanced Overlay (T/C/V) (currently: {'ON' if advanced_overlay else 'OFF'})")
-        print(ctext("2) ", color=Fore.YELLOW) + f"Toggle Side-by-Side Output (currently: {'ON' if side_by_side else 'OFF'})")
-        print(ctext("3) ", color=Fore.YELLOW) + f"Set Annotation Font Scale (currently: {annotation_font_scale})")
-        print(ctext("4) ", color=Fore.YELLOW) + f"Toggle Top-Left Summary of Boxes (currently: {'ON' if show_top_left_list else 'OFF'})")
-        print(ctext("5) ", color=Fore.YELLOW) + f"Toggle Color Patch for Hue (currently: {'ON' if show_color_patch else 'OFF'})")
-        print(ctext("6) ", color=Fore.YELLOW) + f"Toggle Value Debouncing (3-frame) (currently: {'ON' if debounce_enabled else 'OFF'})")
-        print(ctext("7) ", color=Fore.YELLOW) + "Per-Class Label Visibility Toggles (vessel, solid, residue, empty, homo, hetero)")
-        print(ctext("8) ", color=Fore.YELLOW) + "T/C/V Visibility Toggles")
-        print(ctext("9) ", color=Fore.YELLOW) + "Return to Main Menu")
+        print_menu("Overlays & Thresholds", [
+            f"Toggle Advanced Overlay (T/C/V) (currently: {ON_OFF[advanced_overlay]})",
+            f"Toggle Side-by-Side Output (currently: {ON_OFF[side_by_side]})",
+            f"Set Annotation Font Scale (currently: {annotation_font_scale})",
+            f"Toggle Top-Left Summary of Boxes (currently: {ON_OFF[show_top_left_list]})",
+            f"Toggle Color Patch for Hue (currently: {ON_OFF[show_color_patch]})",
+            f"Toggle Value Debouncing ({DEBOUNCE_WINDOW}-frame) (currently: {ON_OFF[debounce_enabled]})",
+            "Per-Class Label Visibility Toggles (vessel, solid, residue, empty, homo, hetero)",
+            "T/C/V Visibility Toggles",
+            f"Set Video Frame Stride (currently: every {frame_stride} frame(s))",
+            f"Set Video Detection Stride (currently: every {detect_stride} frame(s))",
+            f"Set T/C Pixel Sampling Stride (currently: every {tcv_sample_stride} pixel(s))",
+            "Return to Main Menu",
+        ])
 
         choice = input(ctext("Enter your choice: ", color=Fore.YELLOW)).strip()
         if choice == "1":
@@ -267,15 +486,21 @@ def submenu_overlays_and_thresholds():
         elif choice == "8":
             submenu_metric_visibility()
         elif choice == "9":
+            handle_set_frame_stride()
+        elif choice == "10":
+            handle_set_detect_stride()
+        elif choice == "11":
+            handle_set_tcv_sample_stride()
+        elif choice == "12":
             break
         else:
-            print(ctext("Invalid choice (1-9).", color=Fore.RED))
+            print(ctext("Invalid choice (1-12).", color=Fore.RED))
 
 
 def handle_toggle_side_by_side():
     global side_by_side
     side_by_side = not side_by_side
-    print(ctext(f"Side-by-Side is now {'ON' if side_by_side else 'OFF'}.", color=Fore.GREEN))
+    print(ctext(f"Side-by-Side is now {ON_OFF[side_by_side]}.", color=Fore.GREEN))
 
 def handle_set_font_scale():
     global annotation_font_scale
@@ -290,22 +515,67 @@ def handle_set_font_scale():
 def handle_toggle_top_left_list():
     global show_top_left_list
     show_top_left_list = not show_top_left_list
-    print(ctext(f"Top-Left List is now {'ON' if show_top_left_list else 'OFF'}.", color=Fore.GREEN))
+    print(ctext(f"Top-Left List is now {ON_OFF[show_top_left_list]}.", color=Fore.GREEN))
 
 def handle_toggle_color_patch():
     global show_color_patch
     show_color_patch = not show_color_patch
-    print(ctext(f"Color Patch for Hue is now {'ON' if show_color_patch else 'OFF'}.", color=Fore.GREEN))
+    print(ctext(f"Color Patch for Hue is now {ON_OFF[show_color_patch]}.", color=Fore.GREEN))
 
 def handle_toggle_overlay():
     global advanced_overlay
     advanced_overlay = not advanced_overlay
-    print(ctext(f"Advanced overlay is now {'ON' if advanced_overlay else 'OFF'}.", color=Fore.GREEN))
+    print(ctext(f"Advanced overlay is now {ON_OFF[advanced_overlay]}.", color=Fore.GREEN))
 
 def handle_toggle_debouncing():
     global debounce_enabled
     debounce_enabled = not debounce_enabled
-    print(ctext(f"Value Debouncing is now {'ON' if debounce_enabled else 'OFF'}.", color=Fore.GREEN))
+    print(ctext(f"Value Debouncing is now {ON_OFF[debounce_enabled]}.", color=Fore.GREEN))
+
+def handle_set_frame_stride():
+    global frame_stride
+    val_str = input(ctext(f"Process every Nth video frame (int >= 1), current={frame_stride}: ", color=Fore.YELLOW))
+    try:
+        if val_str.strip():
+            val = int(val_str)
+            if val < 1:
+                raise ValueError
+            frame_stride = val
+            print(ctext(f"Video frame stride set to {frame_stride}.", color=Fore.GREEN))
+    except ValueError:
+        print(ctext("Invalid stride, no change made.", color=Fore.RED))
+
+def handle_set_detect_stride():
+    global detect_stride
+    print(ctext("Frames between detections reuse the last boxes; T/C/V are still measured on every frame.",
+                color=Fore.CYAN))
+    val_str = input(ctext(f"Run detection on every Nth processed video frame (int >= 1), current={detect_stride}: ",
+                          color=Fore.YELLOW))
+    try:
+        if val_str.strip():
+            val = int(val_str)
+            if val < 1:
+                raise ValueError
+            detect_stride = val
+            print(ctext(f"Video detection stride set to {detect_stride}.", color=Fore.GREEN))
+    except ValueError:
+        print(ctext("Invalid stride, no change made.", color=Fore.RED))
+
+def handle_set_tcv_sample_stride():
+    global tcv_sample_stride
+    print(ctext("T and C are averages over the liquid box; sampling every Nth pixel row/column "
+                "is much cheaper on large boxes but can shift the values slightly.", color=Fore.CYAN))
+    val_str = input(ctext(f"Sample every Nth pixel for T/C (int >= 1), current={tcv_sample_stride}: ",
+                          color=Fore.YELLOW))
+    try:
+        if val_str.strip():
+            val = int(val_str)
+            if val < 1:
+                raise ValueError
+            tcv_sample_stride = val
+            print(ctext(f"T/C pixel sampling stride set to {tcv_sample_stride}.", color=Fore.GREEN))
+    except ValueError:
+        print(ctext("Invalid stride, no change made.", color=Fore.RED))
 
 
 def submenu_label_visibility():
@@ -313,60 +583,63 @@ def submenu_label_visibility():
     global show_label_homo, show_label_hetero
 
     while True:
-        print(ctext("\n=== Per-Class Label Visibility ===", color=Fore.GREEN, style=Style.BRIGHT))
-        print(ctext("1) ", color=Fore.YELLOW) + f"Toggle Vessel (currently: {'ON' if show_label_vessel else 'OFF'})")
-        print(ctext("2) ", color=Fore.YELLOW) + f"Toggle Solid (currently: {'ON' if show_label_solid else 'OFF'})")
-        print(ctext("3) ", color=Fore.YELLOW) + f"Toggle Residue (currently: {'ON' if show_label_residue else 'OFF'})")
-        print(ctext("4) ", color=Fore.YELLOW) + f"Toggle Empty (currently: {'ON' if show_label_empty else 'OFF'})")
-        print(ctext("5) ", color=Fore.YELLOW) + f"Toggle Homo (currently: {'ON' if show_label_homo else 'OFF'})")
-        print(ctext("6) ", color=Fore.YELLOW) + f"Toggle Hetero (currently: {'ON' if show_label_hetero else 'OFF'})")
-        print(ctext("7) ", color=Fore.YELLOW) + "Return to Overlays Menu")
+        print_menu("Per-Class Label Visibility", [
+            f"Toggle Vessel (currently: {ON_OFF[show_label_vessel]})",
+            f"Toggle Solid (currently: {ON_OFF[show_label_solid]})",
+            f"Toggle Residue (currently: {ON_OFF[show_label_residue]})",
+            f"Toggle Empty (currently: {ON_OFF[show_label_empty]})",
+            f"Toggle Homo (currently: {ON_OFF[show_label_homo]})",
+            f"Toggle Hetero (currently: {ON_OFF[show_label_hetero]})",
+            "Return to Overlays Menu",
+        ])
 
         choice = input(ctext("Enter your choice: ", color=Fore.YELLOW)).strip()
         if choice == "1":
             show_label_vessel = not show_label_vessel
-            print(ctext(f"Vessel Label: {'ON' if show_label_vessel else 'OFF'}", color=Fore.GREEN))
+            print(ctext(f"Vessel Label: {ON_OFF[show_label_vessel]}", color=Fore.GREEN))
         elif choice == "2":
             show_label_solid = not show_label_solid
-            print(ctext(f"Solid Label: {'ON' if show_label_solid else 'OFF'}", color=Fore.GREEN))
+            print(ctext(f"Solid Label: {ON_OFF[show_label_solid]}", color=Fore.GREEN))
         elif choice == "3":
             show_label_residue = not show_label_residue
-            print(ctext(f"Residue Label: {'ON' if show_label_residue else 'OFF'}", color=Fore.GREEN))
+            print(ctext(f"Residue Label: {ON_OFF[show_label_residue]}", color=Fore.GREEN))
         elif choice == "4":
             show_label_empty = not show_label_empty
-            print(ctext(f"Empty Label: {'ON' if show_label_empty else 'OFF'}", color=Fore.GREEN))
+            print(ctext(f"Empty Label: {ON_OFF[show_label_empty]}", color=Fore.GREEN))
         elif choice == "5":
             show_label_homo = not show_label_homo
-            print(ctext(f"Homo Label: {'ON' if show_label_homo else 'OFF'}", color=Fore.GREEN))
+            print(ctext(f"Homo Label: {ON_OFF[show_label_homo]}", color=Fore.GREEN))
         elif choice == "6":
             show_label_hetero = not show_label_hetero
-            print(ctext(f"Hetero Label: {'ON' if show_label_hetero else 'OFF'}", color=Fore.GREEN))
+            print(ctext(f"Hetero Label: {ON_OFF[show_label_hetero]}", color=Fore.GREEN))
         elif choice == "7":
             break
         else:
             print(ctext("Invalid choice (1-7).", color=Fore.RED))
+        invalidate_class_tables()
 
 
 def submenu_metric_visibility():
     global show_metric_t, show_metric_c, show_metric_v
 
     while True:
-        print(ctext("\n=== T/C/V Metric Visibility ===", color=Fore.GREEN, style=Style.BRIGHT))
-        print(ctext("1) ", color=Fore.YELLOW) + f"Toggle Turbidity (T) (currently: {'ON' if show_metric_t else 'OFF'})")
-        print(ctext("2) ", color=Fore.YELLOW) + f"Toggle Color (C) (currently: {'ON' if show_metric_c else 'OFF'})")
-        print(ctext("3) ", color=Fore.YELLOW) + f"Toggle Volume (V) (currently: {'ON' if show_metric_v else 'OFF'})")
-        print(ctext("4) ", color=Fore.YELLOW) + "Return to Overlays Menu")
+        print_menu("T/C/V Metric Visibility", [
+            f"Toggle Turbidity (T) (currently: {ON_OFF[show_metric_t]})",
+            f"Toggle Color (C) (currently: {ON_OFF[show_metric_c]})",
+            f"Toggle Volume (V) (currently: {ON_OFF[show_metric_v]})",
+            "Return to Overlays Menu",
+        ])
 
         choice = input(ctext("Enter your choice: ", color=Fore.YELLOW)).strip()
         if choice == "1":
             show_metric_t = not show_metric_t
-            print(ctext(f"Turbidity (T) Overlay: {'ON' if show_metric_t else 'OFF'}", color=Fore.GREEN))
+            print(ctext(f"Turbidity (T) Overlay: {ON_OFF[show_metric_t]}", color=Fore.GREEN))
         elif choice == "2":
             show_metric_c = not show_metric_c
-            print(ctext(f"Color (C) Overlay: {'ON' if show_metric_c else 'OFF'}", color=Fore.GREEN))
+            print(ctext(f"Color (C) Overlay: {ON_OFF[show_metric_c]}", color=Fore.GREEN))
         elif choice == "3":
             show_metric_v = not show_metric_v
-            print(ctext(f"Volume (V) Overlay: {'ON' if show_metric_v else 'OFF'}", color=Fore.GREEN))
+            print(ctext(f"Volume (V) Overlay: {ON_OFF[show_metric_v]}", color=Fore.GREEN))
         elif choice == "4":
             break
         else:
@@ -379,12 +652,17 @@ def submenu_metric_visibility():
 
 def submenu_heinsight_management():
     while True:
-        print(ctext("\n=== HeinSight Management ===", color=Fore.GREEN, style=Style.BRIGHT))
-        print(ctext("1) ", color=Fore.YELLOW) + "Pick HeinSight Directory (for dynamic import)")
-        print(ctext("2) ", color=Fore.YELLOW) + "Reload YOLO Models")
-        # --- ADDED FOR CPU-ONLY TOGGLE ---
-        print(ctext("3) ", color=Fore.YELLOW) + f"Toggle CPU Only Inference (currently: {'ON' if cpu_only_inference else 'OFF'})")
-        print(ctext("4) ", color=Fore.YELLOW) + "Return to Main Menu")
+        print_menu("HeinSight Management", [
+            "Pick HeinSight Directory (for dynamic import)",
+            "Reload YOLO Models",
+            # --- ADDED FOR CPU-ONLY TOGGLE ---
+            f"Toggle CPU Only Inference (currently: {ON_OFF[cpu_only_inference]})",
+            f"Set Video Inference Batch Size (currently: {batch_size_label()})",
+            f"Toggle TensorRT FP16 Engines (currently: {ON_OFF[use_tensorrt_engines]})",
+            f"Set Vessel Detector Input Size (currently: {vessel_imgsz_label()})",
+            f"Toggle FFmpeg Video Backend (HW decode/encode) (currently: {ON_OFF[ffmpeg_backend]})",
+            "Return to Main Menu",
+        ])
 
         choice = input(ctext("Enter your choice: ", color=Fore.YELLOW)).strip()
         if choice == "1":
@@ -394,24 +672,31 @@ def submenu_heinsight_management():
         elif choice == "3":
             handle_toggle_cpu_only_inference()
         elif choice == "4":
+            handle_set_batch_size()
+        elif choice == "5":
+            handle_toggle_tensorrt()
+        elif choice == "6":
+            handle_set_vessel_imgsz()
+        elif choice == "7":
+            handle_toggle_ffmpeg_backend()
+        elif choice == "8":
             break
         else:
-            print(ctext("Invalid choice (1-4).", color=Fore.RED))
+            print(ctext("Invalid choice (1-8).", color=Fore.RED))
 
 def handle_pick_heinsight_dir():
     """
     Let the user pick a new 'heinsight4.0' folder at runtime (if needed).
     """
     global heinsight_dir, heinsight_module_available, HeinSight
-    root = tk.Tk()
-    root.withdraw()
-    messagebox.showinfo("Foresight", "Select the 'heinsight4.0' folder.")
-    chosen_dir = filedialog.askdirectory(title="Select HeinSight Root Folder (heinsight4.0)")
-    root.destroy()
+    chosen_dir = ask_path("Select the 'heinsight4.0' folder.",
+                          "Select HeinSight Root Folder (heinsight4.0)",
+                          dialog_initial_dir("heinsight"), directory=True)
 
     if not chosen_dir or not os.path.isdir(chosen_dir):
         print(ctext("No valid directory selected for heinsight. Aborting.", color=Fore.RED))
         return
+    remember_dialog_dir("heinsight", chosen_dir)
 
     # check subfolder
     sub_heinsight = os.path.join(chosen_dir, "heinsight")
@@ -422,7 +707,7 @@ def handle_pick_heinsight_dir():
 
     # update
     heinsight_dir = sub_heinsight
-    sys.path.insert(0, heinsight_dir)
+    prepend_sys_path(heinsight_dir)
     print(ctext(f"Added to sys.path: {heinsight_dir}", color=Fore.GREEN))
 
     attempt_import_heinsight()
@@ -433,6 +718,7 @@ def handle_pick_heinsight_dir():
 
 def handle_reload_models():
     global heinsight_obj
+    wait_for_model_warmup()
     if not heinsight_module_available or HeinSight is None:
         print(ctext("ERROR: HeinSight not imported. Use 'Pick HeinSight Directory' first.", color=Fore.RED))
         return
@@ -452,43 +738,103 @@ def handle_reload_models():
 def handle_toggle_cpu_only_inference():
     global cpu_only_inference
     cpu_only_inference = not cpu_only_inference
-    print(ctext(f"CPU Only Inference is now {'ON' if cpu_only_inference else 'OFF'}.", color=Fore.GREEN))
+    print(ctext(f"CPU Only Inference is now {ON_OFF[cpu_only_inference]}.", color=Fore.GREEN))
+    if cpu_only_inference and _engine_batch_size is not None:
+        # the loaded .engine models only run on CUDA
+        print(ctext("The loaded TensorRT engines need a GPU; "
+                    "use 'Reload YOLO Models' to switch to the PyTorch models.", color=Fore.YELLOW))
+
+def handle_toggle_tensorrt():
+    global use_tensorrt_engines
+    use_tensorrt_engines = not use_tensorrt_engines
+    print(ctext(f"TensorRT FP16 Engines are now {ON_OFF[use_tensorrt_engines]}.", color=Fore.GREEN))
+    print(ctext("Use 'Reload YOLO Models' to apply.", color=Fore.YELLOW))
+
+def vessel_imgsz_label():
+    return f"{vessel_imgsz}px" if vessel_imgsz else "model default"
+
+def handle_set_vessel_imgsz():
+    global vessel_imgsz
+    print(ctext("Vessels only need coarse localisation; a smaller input size speeds up the vessel model.",
+                color=Fore.CYAN))
+    print(ctext("Contents are still detected on the full-resolution vessel crops.", color=Fore.CYAN))
+    val_str = input(ctext(f"Vessel detector input size (multiple of 32, 0 = model default), "
+                          f"current={vessel_imgsz_label()}: ", color=Fore.YELLOW))
+    try:
+        if val_str.strip():
+            val = int(val_str)
+            if val < 0 or val % 32:
+                raise ValueError
+            vessel_imgsz = val
+            print(ctext(f"Vessel detector input size set to {vessel_imgsz_label()}.", color=Fore.GREEN))
+    except ValueError:
+        print(ctext("Invalid input size, no change made.", color=Fore.RED))
+
+def handle_set_batch_size():
+    global inference_batch_size
+    val_str = input(ctext(f"Frames per YOLO batch for videos (int >= 1, 0 = auto from GPU memory), "
+                          f"current={batch_size_label()}: ", color=Fore.YELLOW))
+    try:
+        if val_str.strip():
+            val = int(val_str)
+            if val < 0:
+                raise ValueError
+            inference_batch_size = val
+            print(ctext(f"Inference batch size set to {batch_size_label()}.", color=Fore.GREEN))
+            if _engine_batch_size is not None and (val == 0 or val > _engine_batch_size):
+                print(ctext(f"The loaded TensorRT engines take at most {_engine_batch_size} frames per batch; "
+                            "use 'Reload YOLO Models' to rebuild them for a larger size.", color=Fore.YELLOW))
+    except ValueError:
+        print(ctext("Invalid batch size, no change made.", color=Fore.RED))
 
 
 # =============================================================================
 #   MENU HANDLERS (Setup & Run)
 # =============================================================================
 
+def is_live_source(src):
+    """
+    True for camera indices ("0") and stream URLs ("rtsp://...") as opposed to files.
+    """
+    return src.isdigit() or "://" in src
+
 def handle_pick_input_file():
     global input_file
-    root = tk.Tk()
-    root.withdraw()
-    messagebox.showinfo("Foresight", "Select an image (jpg, png) or video (mp4, avi, etc.).")
-    chosen_file = filedialog.askopenfilename(
-        title="Select Image or Video",
+    typed = input(ctext("Press Enter to browse for a file, or type a stream URL / camera index: ",
+                        color=Fore.YELLOW)).strip()
+    if typed:
+        if is_live_source(typed) or os.path.isfile(typed):
+            input_file = typed
+            print(ctext(f"Input set to: {input_file}", color=Fore.GREEN))
+        else:
+            print(ctext("Not a file, stream URL or camera index. Input file not changed.", color=Fore.RED))
+        return
+
+    chosen_file = ask_path(
+        "Select an image (jpg, png) or video (mp4, avi, etc.).",
+        "Select Image or Video",
+        dialog_initial_dir("input"),
         filetypes=[
             ("Image/Video", "*.png *.jpg *.jpeg *.bmp *.tif *.tiff *.mp4 *.avi *.mkv *.mov"),
             ("All Files", "*.*")
         ]
     )
-    root.destroy()
 
     if chosen_file and os.path.isfile(chosen_file):
         input_file = chosen_file
+        remember_dialog_dir("input", os.path.dirname(chosen_file))
         print(ctext(f"Input file set to: {input_file}", color=Fore.GREEN))
     else:
         print(ctext("No valid file selected. Input file not changed.", color=Fore.RED))
 
 def handle_pick_output_directory():
     global output_dir
-    root = tk.Tk()
-    root.withdraw()
-    messagebox.showinfo("Foresight", "Select a directory to save your annotated image/video.")
-    chosen_dir = filedialog.askdirectory(title="Select Output Directory")
-    root.destroy()
+    chosen_dir = ask_path("Select a directory to save your annotated image/video.",
+                          "Select Output Directory", dialog_initial_dir("output"), directory=True)
 
     if chosen_dir and os.path.isdir(chosen_dir):
         output_dir = chosen_dir
+        remember_dialog_dir("output", chosen_dir)
         print(ctext(f"Output directory set to: {output_dir}", color=Fore.GREEN))
     else:
         print(ctext("No valid directory selected. Output directory not changed.", color=Fore.RED))
@@ -520,7 +866,16 @@ def handle_set_thresholds():
 def handle_toggle_auto_open():
     global auto_open_output
     auto_open_output = not auto_open_output
-    print(ctext(f"Auto-Open Output is now {'ON' if auto_open_output else 'OFF'}.", color=Fore.GREEN))
+    print(ctext(f"Auto-Open Output is now {ON_OFF[auto_open_output]}.", color=Fore.GREEN))
+
+def handle_toggle_ffmpeg_backend():
+    global ffmpeg_backend
+    ffmpeg_backend = not ffmpeg_backend
+    print(ctext(f"FFmpeg Video Backend is now {ON_OFF[ffmpeg_backend]}.", color=Fore.GREEN))
+    if ffmpeg_backend:
+        import shutil
+        if shutil.which("ffmpeg") is None:
+            print(ctext("WARNING: 'ffmpeg' not found on PATH; OpenCV will be used instead.", color=Fore.YELLOW))
 
 
 def handle_run_detection():
@@ -528,28 +883,51 @@ def handle_run_detection():
     if not heinsight_module_available or HeinSight is None:
         print(ctext("ERROR: HeinSight is not imported. Pick the directory under 'HeinSight Management'.", color=Fore.RED))
         return
+    wait_for_model_warmup()
     if heinsight_obj is None:
         print(ctext("ERROR: YOLO models not loaded. Use 'HeinSight Management' -> Reload YOLO Models.", color=Fore.RED))
         return
-    if not input_file or not os.path.isfile(input_file):
+    is_live = bool(input_file) and is_live_source(input_file)
+    if not input_file or not (is_live or os.path.isfile(input_file)):
         print(ctext("ERROR: No valid input file. Pick one under 'Setup & Run Detection'.", color=Fore.RED))
         return
 
     if not output_dir or not os.path.isdir(output_dir):
-        fallback_dir = os.path.dirname(input_file)
+        fallback_dir = os.getcwd() if is_live else os.path.dirname(input_file)
         print(ctext(f"WARNING: No valid output directory. Using {fallback_dir}", color=Fore.YELLOW))
         out_dir = fallback_dir
     else:
         out_dir = output_dir
 
-    ext = os.path.splitext(input_file)[1].lower()
-    is_image = ext in IMAGE_EXTS
-    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    if is_live:
+        is_image = False
+        base_name = f"camera{input_file}" if input_file.isdigit() else "stream"
+        ext = ""
+    else:
+        base_name, ext = os.path.splitext(os.path.basename(input_file))
+        is_image = ext.casefold() in IMAGE_EXTS
     out_name = f"{base_name}_annotated.png" if is_image else f"{base_name}_annotated.mp4"
     out_path = os.path.join(out_dir, out_name)
 
+    copied = False
+    method = passthrough_method(heinsight_obj, is_image, is_live, ext)
+    if method == "copy":
+        import shutil
+        shutil.copyfile(input_file, out_path)
+        copied = True
+    elif method == "remux":
+        copied = remux_video(input_file, out_path)
+    if copied:
+        print(ctext("All labels are hidden; input copied without running detection.", color=Fore.YELLOW))
+        print(ctext(f"Annotated output saved to: {out_path}", color=Fore.GREEN))
+        if auto_open_output:
+            open_file_in_viewer(out_path)
+        return
+
     try:
         print(ctext(f"\nRunning detection on: {input_file}", color=Fore.GREEN))
+        if is_live:
+            print(ctext("Live source: press Ctrl+C to stop recording.", color=Fore.YELLOW))
         if is_image:
             success = process_image(input_file, out_path, heinsight_obj, thresholds)
         else:
@@ -562,6 +940,7 @@ def handle_run_detection():
         else:
             print(ctext("Detection finished, but output was not saved successfully.", color=Fore.RED))
     except Exception as e:
+        import traceback
         print(ctext("ERROR during detection:", color=Fore.RED))
         traceback.print_exc()
 
@@ -570,47 +949,173 @@ def handle_run_detection():
 #   LOAD HEINSIGHT MODELS
 # =============================================================================
 
-def load_heinsight_models():
-    global heinsight_obj, heinsight_module_available, HeinSight, heinsight_dir
+def load_heinsight_models(log=print):
+    """
+    Load the HeinSight YOLO models into heinsight_obj. Status messages go
+    to `log` (print by default; the launch warm-up thread queues them).
+    """
+    global heinsight_obj, heinsight_module_available, HeinSight, heinsight_dir, _engine_batch_size
     if not heinsight_module_available or HeinSight is None:
-        print(ctext("ERROR: 'heinsight' not imported, cannot load YOLO models.", color=Fore.RED))
+        log(ctext("ERROR: 'heinsight' not imported, cannot load YOLO models.", color=Fore.RED))
         return False
     if not heinsight_dir or not os.path.isdir(heinsight_dir):
-        print(ctext("ERROR: No valid heinsight_dir set. Cannot load YOLO models.", color=Fore.RED))
+        log(ctext("ERROR: No valid heinsight_dir set. Cannot load YOLO models.", color=Fore.RED))
         return False
 
     try:
-        print(ctext("Loading YOLO models from HeinSight...", color=Fore.GREEN))
+        log(ctext("Loading YOLO models from HeinSight...", color=Fore.GREEN))
         vessel_path = os.path.join(heinsight_dir, "models", "best_vessel.pt")
         content_path = os.path.join(heinsight_dir, "models", "best_content.pt")
 
         obj = HeinSight(vial_model_path=vessel_path, contents_model_path=content_path)
+        # Size any new engines from the configured batch, not the old engines'
+        _engine_batch_size = None
+        if use_tensorrt_engines:
+            if cpu_only_inference:
+                log(ctext("TensorRT needs a GPU; keeping PyTorch models (CPU Only is ON).", color=Fore.YELLOW))
+            else:
+                obj.vial_model = load_tensorrt_engine(obj.vial_model, vessel_path, log)
+                obj.contents_model = load_tensorrt_engine(obj.contents_model, content_path, log)
         heinsight_obj = obj
-        print(ctext("HeinSight YOLO models loaded successfully.\n", color=Fore.GREEN))
+        log(ctext("HeinSight YOLO models loaded successfully.\n", color=Fore.GREEN))
         return True
     except Exception as e:
-        print(ctext("Failed to load HeinSight YOLO models.", color=Fore.RED))
-        traceback.print_exc()
+        import traceback
+        log(ctext("Failed to load HeinSight YOLO models.", color=Fore.RED))
+        log(traceback.format_exc().rstrip())
         heinsight_obj = None
         return False
 
 
+def load_tensorrt_engine(pt_model, pt_path, log=print):
+    """
+    Return a YOLO model backed by a TensorRT FP16 engine for `pt_path`.
+    The engine is exported once and cached next to the .pt file (keyed by
+    the max batch size it was built for); on any failure the PyTorch model
+    is returned unchanged.
+    """
+    global _engine_batch_size
+    batch = resolve_batch_size()
+    engine_path = f"{os.path.splitext(pt_path)[0]}_fp16_b{batch}.engine"
+    try:
+        from ultralytics import YOLO
+        if not os.path.isfile(engine_path):
+            log(ctext(f"Exporting TensorRT engine (one-time, may take minutes): {engine_path}", color=Fore.YELLOW))
+            exported = pt_model.export(format="engine", half=True, dynamic=True, batch=batch, device=0)
+            os.replace(exported, engine_path)
+        engine_model = YOLO(engine_path, task="detect")
+        _engine_batch_size = batch
+        log(ctext(f"Using TensorRT engine: {engine_path}", color=Fore.GREEN))
+        return engine_model
+    except Exception as e:
+        log(ctext(f"WARNING: TensorRT engine unavailable ({e}); using {pt_path}", color=Fore.YELLOW))
+        return pt_model
+
+
+def warm_start_models():
+    """
+    Load the YOLO models and run one dummy inference through each, so that
+    weight deserialization, CUDA context creation and cuDNN autotuning are
+    paid before the first real detection rather than during it. Runs on
+    _warmup_thread, so it only queues messages for report_model_warmup().
+    """
+    log = _warmup_messages.append
+    try:
+        if not load_heinsight_models(log):
+            return
+        _load_vision_libs()
+        obj = heinsight_obj
+        dummy = np.zeros((640, 640, 3), dtype=np.uint8)
+        _, device_for_inference, use_half = inference_settings(None)
+        obj.vial_model.predict(dummy, verbose=False, device=device_for_inference, half=use_half)
+        obj.contents_model.predict(dummy, verbose=False, device=device_for_inference, half=use_half)
+    except Exception as e:
+        # Not fatal: the models stay loaded, real detection reports real errors
+        log(ctext(f"WARNING: YOLO warm-up inference failed: {e}", color=Fore.YELLOW))
+
+
+# Auto batch size: GPU memory budgeted per 640px image in a batch, and the cap
+AUTO_BATCH_MB_PER_IMAGE = 256
+AUTO_BATCH_MAX = 32
+_auto_batch_size = None   # cached result of the free-memory probe
+_engine_batch_size = None  # max batch of the loaded TensorRT engines, if any
+
+
+def resolve_batch_size():
+    """
+    The batch size to use: the configured value, or for auto (0) one sized
+    from the free CUDA memory at first use (half of it, AUTO_BATCH_MB_PER_IMAGE
+    each). Auto falls back to 1 on CPU or when CUDA can't be queried.
+    Capped at the batch the loaded TensorRT engines were built for.
+    """
+    global _auto_batch_size
+    if inference_batch_size > 0:
+        batch = inference_batch_size
+    elif cpu_only_inference:
+        batch = 1
+    else:
+        if _auto_batch_size is None:
+            try:
+                import torch
+                free_bytes, _ = torch.cuda.mem_get_info()
+                fit = int(free_bytes / 2 / (AUTO_BATCH_MB_PER_IMAGE * 1024 * 1024))
+                _auto_batch_size = max(1, min(AUTO_BATCH_MAX, fit))
+            except Exception:
+                _auto_batch_size = 1
+        batch = _auto_batch_size
+    if _engine_batch_size is not None:
+        batch = min(batch, _engine_batch_size)
+    return batch
+
+
+def batch_size_label():
+    if inference_batch_size > 0:
+        return str(inference_batch_size)
+    return "auto" if _auto_batch_size is None else f"auto ({_auto_batch_size})"
+
+
+def wait_for_model_warmup():
+    """
+    Block until the launch-time model warm-up (if any) has finished.
+    """
+    if _warmup_thread is not None and _warmup_thread.is_alive():
+        print(ctext("Waiting for YOLO models to finish loading...", color=Fore.YELLOW))
+        _warmup_thread.join()
+    report_model_warmup()
+
+
+def report_model_warmup():
+    """
+    Print (from the main thread) whatever the warm-up thread has queued
+    so far, once it has finished.
+    """
+    if _warmup_thread is None or _warmup_thread.is_alive():
+        return
+    while _warmup_messages:
+        print(_warmup_messages.pop(0))
+
+
 # =============================================================================
 #   IMAGE / VIDEO PROCESSING
 # =============================================================================
 
-last_frame_bboxes = []
-debounce_map = {}
-
-IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+# Max frames buffered between the reader -> detection -> writer video stages
+VIDEO_PREFETCH = 8
 
 def process_image(file_path, out_path, h_obj, thr):
+    _load_vision_libs()
     frame = cv2.imread(file_path)
     if frame is None:
         print(ctext(f"ERROR: Could not read image: {file_path}", color=Fore.RED))
         return False
 
-    annotated = run_detection_on_frame(frame, h_obj, thr)
+    annotated = None
+    if annotations_visible(h_obj):
+        # draw in place unless the untouched frame is still needed
+        canvas = frame.copy() if side_by_side else frame
+        annotated = run_detection_on_frame(frame, h_obj, thr, canvas)
+    else:
+        last_frame_bboxes.clear()
     if annotated is None:
         annotated = frame
 
@@ -626,13 +1131,17 @@ def process_image(file_path, out_path, h_obj, thr):
 
 
 def process_video(file_path, out_path, h_obj, thr):
-    global debounce_map
-    debounce_map.clear()  # start fresh for this video
+    _load_vision_libs()
+    reset_tracks()  # start fresh for this video
+    reset_progress_bar()
 
-    cap = cv2.VideoCapture(file_path)
+    cap = open_video_capture(file_path)
     if not cap.isOpened():
         print(ctext(f"ERROR: Cannot open video: {file_path}", color=Fore.RED))
         return False
+    # Keep at most one frame in the backend buffer: no effect on files, but
+    # stops live cameras/streams from handing us several-frames-old images
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
     fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
@@ -642,40 +1151,367 @@ def process_video(file_path, out_path, h_obj, thr):
     out_width = width * 2 if side_by_side else width
     out_height = height
 
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out_vid = cv2.VideoWriter(out_path, fourcc, fps if fps > 0 else 25, (out_width, out_height))
+    # Frames skipped by the stride are grabbed but never decoded, and the
+    # output FPS is scaled so the result keeps the source's real-time pacing
+    stride = frame_stride
+    out_fps = (fps if fps > 0 else 25) / stride
+
+    use_ffmpeg = ffmpeg_backend and ffmpeg_available()
+    if ffmpeg_backend and not use_ffmpeg:
+        print(ctext("WARNING: 'ffmpeg' not found on PATH; using OpenCV video I/O.", color=Fore.YELLOW))
+
+    if use_ffmpeg:
+        if not is_live_source(file_path):
+            # OpenCV was only needed for the stream metadata above
+            cap.release()
+            cap = FFmpegVideoReader(file_path, width, height)
+        out_vid = FFmpegVideoWriter(out_path, out_fps, (out_width, out_height))
+    else:
+        out_vid = open_cv2_video_writer(out_path, out_fps, (out_width, out_height))
+
+    # 3-stage pipeline: a reader thread decodes frame N+1 and a writer thread
+    # encodes frame N-1 while this thread runs detection on frame N. YOLO and
+    # the debounce state stay on this thread; the bounded queues give back-pressure.
+    # The read queue holds two batches, so the next batch is already decoded
+    # when detection on the current one finishes.
+    batch_size = resolve_batch_size()
+    read_depth = max(VIDEO_PREFETCH, 2 * batch_size)
+    read_q = queue.Queue(maxsize=read_depth)
+    write_q = queue.Queue(maxsize=VIDEO_PREFETCH)
+    stop_event = threading.Event()
+    writer_errors = []
+
+    # Preallocated buffer rings reused for every frame instead of allocating
+    # fresh multi-MB arrays. Each ring is larger than the number of frames
+    # that can be in flight (queued, batched, or held by the reader/writer
+    # threads), so a buffer is never overwritten while it is still in use.
+    frame_pool = [np.empty((height, width, 3), np.uint8)
+                  for _ in range(read_depth + batch_size + VIDEO_PREFETCH + 2)]
+    sbs_pool = [np.empty((out_height, out_width, 3), np.uint8)
+                for _ in range(VIDEO_PREFETCH + 2)] if side_by_side else None
+    sbs_slot = 0
+    # overlay toggles can't change mid-run; read them once
+    draw_list = show_top_left_list
+    list_font_scale = annotation_font_scale * 2.0
+    # with every label hidden nothing is drawn: re-encode without inference
+    detect = annotations_visible(h_obj)
+    # Temporal gating: only every detect_every-th frame runs YOLO, the
+    # frames in between reuse its boxes (T/C/V are re-measured per frame)
+    detect_every = detect_stride
+    n_processed = 0
+    last_dets = None
+
+    reader = threading.Thread(target=_video_reader, args=(cap, stride, read_q, stop_event, frame_pool),
+                              daemon=True)
+    writer = threading.Thread(target=_video_writer, args=(out_vid, write_q, writer_errors), daemon=True)
+    reader.start()
+    writer.start()
+
+    batch = []
+    try:
+        while True:
+            item = read_q.get()
+            if item is not None:
+                batch.append(item)
+                if len(batch) < batch_size:
+                    continue
+            if batch:
+                # Batched vessel + contents detection for the whole batch,
+                # then per-frame overlays in order (debouncing depends on order)
+                if detect:
+                    due = [(n_processed + i) % detect_every == 0 for i in range(len(batch))]
+                    to_detect = [f for (_, f), d in zip(batch, due) if d]
+                    fresh = iter(detect_batch(to_detect, h_obj, thr, batch_size) if to_detect else ())
+                    detections = []
+                    for d in due:
+                        if d:
+                            last_dets = next(fresh)
+                        detections.append(last_dets)
+                    n_processed += len(batch)
+                else:
+                    detections = [None] * len(batch)
+                for (frame_idx, frame), frame_dets in zip(batch, detections):
+                    if sbs_pool and frame.shape == (height, width, 3):
+                        # Copy the frame into both halves of the output buffer
+                        # and draw straight into the right half
+                        combo = sbs_pool[sbs_slot]
+                        sbs_slot = (sbs_slot + 1) % len(sbs_pool)
+                        combo[:, :width] = frame
+                        combo[:, width:] = frame
+                        annotate_frame(frame, frame_dets, h_obj, thr, combo[:, width:])
+                        annotated = combo
+                    else:
+                        # draw in place unless the untouched frame is still needed
+                        canvas = frame.copy() if sbs_pool and frame_dets else frame
+                        annotated = annotate_frame(frame, frame_dets, h_obj, thr, canvas)
+                        if annotated is None:
+                            annotated = frame
+                        if sbs_pool:
+                            annotated = combine_side_by_side(frame, annotated)
+
+                    if draw_list:
+                        annotated = draw_top_left_list(annotated, last_frame_bboxes, list_font_scale)
+
+                    write_q.put(annotated)
+                    progress_bar(frame_idx, total_frames)
+                batch = []
+            if item is None:
+                # with a frame stride the last frame index rarely equals the
+                # total, so draw the finished bar explicitly
+                progress_bar(total_frames, total_frames)
+                break
+    except KeyboardInterrupt:
+        # Normal way to end a live stream; the frames so far are still saved
+        print(ctext("\nStopped by user.", color=Fore.YELLOW))
+    finally:
+        stop_event.set()
+        while reader.is_alive():
+            # unblock a reader that is waiting on a full queue
+            try:
+                read_q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        write_q.put(None)
+        writer.join()
+        cap.release()
+        out_vid.release()
+
+    if total_frames > 0:
+        print()  # newline
+    if writer_errors:
+        print(ctext(f"ERROR writing video: {writer_errors[0]}", color=Fore.RED))
+        return False
+    return True
+
+
+def open_video_capture(file_path):
+    """
+    Open a video file/stream URL with the FFmpeg backend and hardware
+    decoding allowed (NVDEC/VA-API/D3D11/VideoToolbox; OpenCV falls back to
+    software when none is usable). Camera indices, and builds without the
+    FFmpeg backend, use cv2's default backend.
+    """
+    if file_path.isdigit():
+        return cv2.VideoCapture(int(file_path))
+    if hasattr(cv2, "CAP_PROP_HW_ACCELERATION"):
+        cap = cv2.VideoCapture(file_path, cv2.CAP_FFMPEG,
+                               [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+        if cap.isOpened():
+            return cap
+    return cv2.VideoCapture(file_path)
+
 
+def _video_reader(cap, stride, read_q, stop_event, frame_pool):
+    """
+    Reader stage: decode every `stride`-th frame and queue (frame_idx, frame).
+    Skipped frames are only grabbed, never decoded. Frames are decoded into
+    the buffers of `frame_pool` in turn. Queues None at the end.
+    """
     frame_idx = 0
+    slot = 0
+    try:
+        while not stop_event.is_set():
+            if not cap.grab():
+                break
+            frame_idx += 1
+            if (frame_idx - 1) % stride:
+                continue
+            ret, frame = cap.retrieve(frame_pool[slot])
+            if not ret:
+                break
+            slot = (slot + 1) % len(frame_pool)
+            read_q.put((frame_idx, frame))
+    finally:
+        read_q.put(None)
+
+
+# Whether OpenCV's FFmpeg backend can encode H.264 here: None = not tried yet
+_cv2_h264_ok = None
+
+
+def open_cv2_video_writer(out_path, fps, size):
+    """
+    Open a cv2.VideoWriter that encodes H.264 ('avc1') through the FFmpeg
+    backend, much smaller on disk than MPEG-4 Part 2. Many OpenCV builds
+    ship without an H.264 encoder, so fall back to 'mp4v' (the result of
+    the first attempt is remembered for the session).
+    """
+    global _cv2_h264_ok
+    if _cv2_h264_ok is not False:
+        log_level = cv2.utils.logging.getLogLevel()
+        cv2.utils.logging.setLogLevel(cv2.utils.logging.LOG_LEVEL_SILENT)
+        try:
+            out_vid = cv2.VideoWriter(out_path, cv2.CAP_FFMPEG, cv2.VideoWriter_fourcc(*'avc1'), fps, size)
+        finally:
+            cv2.utils.logging.setLogLevel(log_level)
+        _cv2_h264_ok = out_vid.isOpened()
+        if _cv2_h264_ok:
+            return out_vid
+        print(ctext("NOTE: this OpenCV build can't encode H.264; writing MPEG-4 ('mp4v') video.",
+                    color=Fore.YELLOW))
+    return cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+
+
+def _video_writer(out_vid, write_q, errors):
+    """
+    Writer stage: encode queued frames until None. On a write error the
+    error is recorded and the queue is still drained so producers never block.
+    """
     while True:
-        ret, frame = cap.read()
-        if not ret:
+        frame = write_q.get()
+        if frame is None:
             break
-        frame_idx += 1
+        if errors:
+            continue
+        try:
+            out_vid.write(frame)
+        except Exception as e:
+            errors.append(e)
+
 
-        annotated = run_detection_on_frame(frame, h_obj, thr)
-        if annotated is None:
-            annotated = frame
+# -------------------------------------------------------------------------
+#  FFMPEG PIPE BACKEND (optional, see ffmpeg_backend)
+# -------------------------------------------------------------------------
 
-        if side_by_side:
-            annotated = combine_side_by_side(frame, annotated)
+# H.264 encoders in order of preference; the first one that works is used
+FFMPEG_ENCODERS = ("h264_nvenc", "h264_qsv", "h264_videotoolbox", "libx264")
+_ffmpeg_encoder = None   # cached result of pick_ffmpeg_encoder()
 
-        if show_top_left_list:
-            annotated = draw_top_left_list(annotated, last_frame_bboxes, annotation_font_scale * 2.0)
 
-        out_vid.write(annotated)
-        progress_bar(frame_idx, total_frames)
+def passthrough_method(h_obj, is_image, is_live, ext):
+    """
+    With every label toggled off and nothing added around the frame, the
+    "annotated" result is the input itself. Returns how to produce it
+    without running detection: "copy" a .png image byte for byte, "remux"
+    the first video stream of a video file (so, like the re-encode path,
+    audio and other streams are dropped), or None to run detection.
+    """
+    if side_by_side or annotations_visible(h_obj):
+        return None
+    if is_image:
+        return "copy" if ext.casefold() == ".png" else None
+    if is_live or frame_stride != 1 or not ffmpeg_available():
+        return None
+    return "remux"
 
-    cap.release()
-    out_vid.release()
-    if total_frames > 0:
-        print()  # newline
-    return True
 
+def ffmpeg_available():
+    import shutil
+    return shutil.which("ffmpeg") is not None
+
+
+def remux_video(in_path, out_path):
+    """
+    Copy the video stream of `in_path` into `out_path` without re-encoding
+    ('-c copy'). Returns False if ffmpeg fails, e.g. when the codec cannot
+    be stored in the output container.
+    """
+    import subprocess
+    result = subprocess.run(
+        ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+         "-i", in_path, "-map", "0:v:0", "-c", "copy", out_path],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return result.returncode == 0
+
+
+def pick_ffmpeg_encoder():
+    """
+    Return the first encoder in FFMPEG_ENCODERS that can actually encode a
+    test frame on this machine (a listed NVENC/QSV encoder may still lack
+    the hardware). Probed once, then cached.
+    """
+    global _ffmpeg_encoder
+    if _ffmpeg_encoder is None:
+        import subprocess
+        _ffmpeg_encoder = "libx264"
+        for enc in FFMPEG_ENCODERS:
+            probe = subprocess.run(
+                ["ffmpeg", "-hide_banner", "-loglevel", "error",
+                 "-f", "lavfi", "-i", "color=size=256x256", "-frames:v", "1",
+                 "-c:v", enc, "-f", "null", "-"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            if probe.returncode == 0:
+                _ffmpeg_encoder = enc
+                break
+    return _ffmpeg_encoder
+
+
+class FFmpegVideoReader:
+    """
+    Stand-in for cv2.VideoCapture (grab/retrieve/release) that decodes
+    through an ffmpeg pipe with '-hwaccel auto', so NVDEC/QSV/VideoToolbox
+    are used when available. Frames arrive as raw BGR24.
+    """
+
+    def __init__(self, path, width, height):
+        import subprocess
+        self.shape = (height, width, 3)
+        self.frame_bytes = width * height * 3
+        self._buf = bytearray(self.frame_bytes)
+        self.proc = subprocess.Popen(
+            # 'fatal': a failed HW-device probe is logged as an error even
+            # though ffmpeg then falls back to software decoding
+            ["ffmpeg", "-hide_banner", "-loglevel", "fatal", "-hwaccel", "auto",
+             "-i", path, "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE
+        )
+
+    def grab(self):
+        # One reused read buffer; retrieve() copies out of it
+        return self.proc.stdout.readinto(self._buf) == self.frame_bytes
+
+    def retrieve(self, image=None):
+        frame = np.frombuffer(self._buf, dtype=np.uint8).reshape(self.shape)
+        if image is None or image.shape != self.shape:
+            return True, frame.copy()
+        np.copyto(image, frame)
+        return True, image
+
+    def release(self):
+        self.proc.stdout.close()
+        self.proc.kill()
+        self.proc.wait()
 
-def run_detection_on_frame(frame, h_obj, thr):
-    global last_frame_bboxes
-    last_frame_bboxes = []
 
+class FFmpegVideoWriter:
+    """
+    Stand-in for cv2.VideoWriter (write/release) that pipes raw BGR frames
+    into ffmpeg, encoding H.264 with the encoder from pick_ffmpeg_encoder().
+    """
+
+    def __init__(self, out_path, fps, size):
+        import subprocess
+        width, height = size
+        encoder = pick_ffmpeg_encoder()
+        cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+               "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}",
+               "-r", str(fps), "-i", "-",
+               "-c:v", encoder]
+        if encoder == "libx264":
+            cmd += ["-preset", "ultrafast"]
+        # yuv420p for player compatibility; it needs even dimensions
+        cmd += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p", out_path]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        self.proc.stdin.write(np.ascontiguousarray(frame).data)
+
+    def release(self):
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        self.proc.wait()
+
+
+def inference_settings(thr):
+    """
+    Return (confidence threshold, device, half) for the YOLO predict calls.
+    On the GPU the models run in FP16, which uses the tensor cores and
+    halves activation memory traffic.
+    """
     conf_thr = 0.4
     if thr is not None:
         conf_thr = thr[3]  # detection confidence
@@ -683,89 +1519,247 @@ def run_detection_on_frame(frame, h_obj, thr):
     # --- ADDED FOR CPU-ONLY TOGGLE ---
     # If cpu_only_inference is True, we pass device='cpu', otherwise 'cuda:0'
     device_for_inference = 'cpu' if cpu_only_inference else 'cuda:0'
+    return conf_thr, device_for_inference, not cpu_only_inference
 
-    # Vessel detection
-    v_preds = h_obj.vial_model.predict(
-        frame,
+
+# Per-frame snapshot of the overlay toggles, see overlay_settings()
+OverlaySettings = namedtuple("OverlaySettings", [
+    "show_t", "show_c", "show_v",          # metric shown (advanced overlay on)
+    "min_turb", "min_col", "min_vol",      # display thresholds
+    "color_patch",                         # hue patch drawn (advanced overlay on)
+    "debounce", "sample_stride", "font_scale",
+])
+
+
+def overlay_settings(thr):
+    """
+    Snapshot the overlay toggles and T/C/V thresholds once per frame, so the
+    per-box code reads one OverlaySettings instead of a handful of module
+    globals. The toggles cannot change while a video is being processed.
+    """
+    min_turb, min_col, min_vol = 0, 0, 0
+    if thr:
+        min_turb, min_col, min_vol, _ = thr
+    return OverlaySettings(advanced_overlay and show_metric_t,
+                           advanced_overlay and show_metric_c,
+                           advanced_overlay and show_metric_v,
+                           min_turb, min_col, min_vol,
+                           advanced_overlay and show_color_patch,
+                           debounce_enabled, tcv_sample_stride, annotation_font_scale)
+
+
+def detect_vessels(frames, h_obj, thr):
+    """
+    Run the vessel model once over a list of frames (one GPU batch) and
+    return one Results object per frame.
+    """
+    conf_thr, device_for_inference, use_half = inference_settings(thr)
+    # boxes come back in original frame coordinates whatever the input size
+    size_arg = {"imgsz": vessel_imgsz} if vessel_imgsz else {}
+    return h_obj.vial_model.predict(
+        frames,
         conf=conf_thr,
         verbose=False,
-        device=device_for_inference  # ensure CPU if toggled
+        device=device_for_inference,  # ensure CPU if toggled
+        half=use_half,
+        **size_arg
     )
-    v_boxes = v_preds[0].boxes
-    if len(v_boxes) == 0:
+
+
+def detect_contents(crops, h_obj, thr, batch_size):
+    """
+    Run the contents model over a list of vessel crops, `batch_size` crops
+    per predict() call, and return one Results object per crop.
+    """
+    conf_thr, device_for_inference, use_half = inference_settings(thr)
+    results = []
+    for i in range(0, len(crops), batch_size):
+        results.extend(h_obj.contents_model.predict(
+            crops[i:i + batch_size],
+            conf=conf_thr,
+            verbose=False,
+            device=device_for_inference,  # ensure CPU if toggled
+            half=use_half
+        ))
+    return results
+
+
+def vessel_crops(frame, v_result):
+    """
+    Clip one frame's vessel boxes to the frame and cut out the region the
+    contents model looks at. Returns (x1, y1, x2, y2, conf, cls, crop)
+    tuples; crop is None for boxes with no area.
+    """
+    h, w = frame.shape[:2]
+    v_xyxy, v_conf, v_cls = boxes_to_arrays(v_result.boxes)
+    clip_boxes(v_xyxy, w, h)
+    vessels = []
+    for (x1v, y1v, x2v, y2v), confv, cls_v in zip(v_xyxy.tolist(), v_conf.tolist(), v_cls.tolist()):
+        crop = frame[y1v:y2v, x1v:x2v]
+        vessels.append((x1v, y1v, x2v, y2v, confv, cls_v, crop if crop.size else None))
+    return vessels
+
+
+def detect_batch(frames, h_obj, thr, batch_size):
+    """
+    Vessel + contents detection for a list of frames: one batched
+    vessel-model call, then the vessel crops of all frames go through the
+    contents model together. Returns, per frame, a list of
+    (vessel tuple from vessel_crops(), contents Results or None).
+    """
+    v_preds = detect_vessels(frames, h_obj, thr)
+    per_frame = [vessel_crops(frame, v_result) for frame, v_result in zip(frames, v_preds)]
+    crops = [v[6] for vessels in per_frame for v in vessels if v[6] is not None]
+    c_preds = iter(detect_contents(crops, h_obj, thr, batch_size))
+    return [[(v, next(c_preds) if v[6] is not None else None) for v in vessels]
+            for vessels in per_frame]
+
+
+def run_detection_on_frame(frame, h_obj, thr, canvas=None):
+    detections = detect_batch([frame], h_obj, thr, resolve_batch_size())
+    return annotate_frame(frame, detections[0], h_obj, thr, canvas)
+
+
+def annotate_frame(frame, detections, h_obj, thr, canvas=None):
+    """
+    Draw one frame's detections (from detect_batch) and measure T/C/V for
+    the liquid boxes. Drawing goes onto `canvas` (a copy the caller made),
+    or straight onto `frame` if none is given. Returns the drawn image, or
+    None if no vessel was found.
+    """
+    global last_frame_bboxes
+    last_frame_bboxes = []
+
+    settings = overlay_settings(thr)
+    debounce = settings.debounce
+    if debounce:
+        age_tracks()
+
+    if not detections:
         return None
 
-    annotated = frame.copy()
+    # skip the HSV/T/C/V work entirely when it would draw nothing
+    measure_tcv = settings.show_t or settings.show_c or settings.show_v or settings.color_patch
+
+    annotated = frame if canvas is None else canvas
     h, w = annotated.shape[:2]
     all_boxes = []
 
-    for vbox in v_boxes:
-        x1v, y1v, x2v, y2v, confv, vessel_label = parse_box_info(vbox, h_obj.vial_model.names)
+    v_names = h_obj.vial_model.names
+    c_names = h_obj.contents_model.names
+    v_visible, v_colors, _ = class_tables(v_names, vessel_model=True)
+    c_visible, c_colors, c_liquid = class_tables(c_names)
 
+    for (x1v, y1v, x2v, y2v, confv, cls_v, _), c_result in detections:
         # Check if user toggled vessel off
-        if vessel_label.lower() == "vessel" and not show_label_vessel:
-            pass
-        else:
-            x1v, x2v = sorted([max(0, min(w, x1v)), max(0, min(w, x2v))])
-            y1v, y2v = sorted([max(0, min(h, y1v)), max(0, min(h, y2v))])
-            v_txt = f"{vessel_label} {confv:.2f}"
-            all_boxes.append((x1v, y1v, x2v, y2v, v_txt))
-
-        # Content detection
-        vessel_crop = annotated[y1v:y2v, x1v:x2v]
-        if vessel_crop.size == 0:
+        if v_visible[cls_v]:
+            v_txt = f"{v_names[cls_v]} {confv:.2f}"
+            all_boxes.append((x1v, y1v, x2v, y2v, v_txt, v_colors[cls_v]))
+
+        if c_result is None:
             continue
+        c_xyxy, c_conf, c_cls = boxes_to_arrays(c_result.boxes)
 
-        c_preds = h_obj.contents_model.predict(
-            vessel_crop,
-            conf=conf_thr,
-            verbose=False,
-            device=device_for_inference  # ensure CPU if toggled
-        )
-        c_boxes = c_preds[0].boxes
-
-        for cbox in c_boxes:
-            x1c, y1c, x2c, y2c, confc, label_c = parse_box_info(cbox, h_obj.contents_model.names)
-            x1c += x1v
-            x2c += x1v
-            y1c += y1v
-            y2c += y1v
-            x1c, x2c = sorted([max(0, min(w, x1c)), max(0, min(w, x2c))])
-            y1c, y2c = sorted([max(0, min(h, y1c)), max(0, min(h, y2c))])
-
-            # skip if user toggled label off
-            if not class_label_is_visible(label_c):
-                continue
+        # skip classes the user toggled off, then shift crop -> frame coords
+        keep = c_visible[c_cls]
+        c_xyxy = clip_boxes(c_xyxy[keep] + (x1v, y1v, x1v, y1v), w, h)
 
+        for (x1c, y1c, x2c, y2c), confc, cls_c in zip(c_xyxy.tolist(), c_conf[keep].tolist(), c_cls[keep].tolist()):
+            label_c = c_names[cls_c]
             c_txt = f"{label_c} {confc:.2f}"
 
             # measure T/C/V if advanced_overlay & it's a "homo"/"hetero"
-            if advanced_overlay and is_liquid_label(label_c):
-                measure_str = measure_liquid_overlay(annotated, x1c, y1c, x2c, y2c, h, thr)
+            if measure_tcv and c_liquid[cls_c]:
+                track_id = match_track(x1c, y1c, x2c, y2c) if debounce else None
+                measure_str = measure_liquid_overlay(annotated, x1c, y1c, x2c, y2c, h, settings, track_id)
                 if measure_str:
                     c_txt += " | " + measure_str
 
-            all_boxes.append((x1c, y1c, x2c, y2c, c_txt))
+            all_boxes.append((x1c, y1c, x2c, y2c, c_txt, c_colors[cls_c]))
 
-    # Draw bounding boxes
-    font_scale = annotation_font_scale
-    for (bx1, by1, bx2, by2, text_label) in all_boxes:
-        color = (0, 255, 255) if "vessel" in text_label.lower() else (0, 0, 255)
-        cv2.rectangle(annotated, (int(bx1), int(by1)), (int(bx2), int(by2)), color, 2)
-        cv2.putText(annotated, text_label, (int(bx1), max(int(by1)-5, 15)),
-                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, 2)
+    # Draw bounding boxes (coords are already plain ints from clip_boxes)
+    font_scale = settings.font_scale
+    for (bx1, by1, bx2, by2, text_label, color) in all_boxes:
+        cv2.rectangle(annotated, (bx1, by1), (bx2, by2), color, 2)
+        cv2.putText(annotated, text_label, (bx1, max(by1 - 5, 15)),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, 2, cv2.LINE_8)
 
     last_frame_bboxes = [b[4] for b in all_boxes]
     return annotated
 
 
-def parse_box_info(box, class_names):
-    arr = box.xyxy[0].cpu().numpy()
-    x1, y1, x2, y2 = map(int, arr[:4])
-    conf = float(box.conf[0])
-    cls_id = int(box.cls[0])
-    label = class_names[cls_id]
-    return x1, y1, x2, y2, conf, label
+def boxes_to_arrays(boxes):
+    """
+    Convert an Ultralytics Boxes object into struct-of-arrays form:
+    xyxy (N,4) int32, conf (N,) float32, cls (N,) int32. One device->host
+    transfer per field instead of one per box.
+    """
+    xyxy = boxes.xyxy.cpu().numpy().astype(np.int32)
+    conf = boxes.conf.cpu().numpy()
+    cls = boxes.cls.cpu().numpy().astype(np.int32)
+    return xyxy, conf, cls
+
+
+def clip_boxes(xyxy, w, h):
+    """
+    Clip (N, 4) int boxes to a w x h frame in place and order each
+    coordinate pair so x1 <= x2 and y1 <= y2. Returns xyxy.
+    """
+    np.clip(xyxy[:, 0::2], 0, w, out=xyxy[:, 0::2])
+    np.clip(xyxy[:, 1::2], 0, h, out=xyxy[:, 1::2])
+    xyxy[:, 0::2].sort(axis=1)
+    xyxy[:, 1::2].sort(axis=1)
+    return xyxy
+
+
+# Box/label colors (BGR): vessels yellow, contents red
+VESSEL_BOX_COLOR = (0, 255, 255)
+CONTENT_BOX_COLOR = (0, 0, 255)
+
+# (visible mask, colors, liquid flags) per model, indexed by class id. Built
+# on first use and invalidated whenever a label-visibility toggle changes.
+_class_table_cache = {}
+
+def class_tables(class_names, vessel_model=False):
+    """
+    Return (visible, colors, liquid) for a model's class names: a bool
+    array, a list of BGR tuples and a list of is_liquid_label() flags, all
+    indexed by class id, so the per-box code does no string work.
+    """
+    entry = _class_table_cache.get(id(class_names))
+    if entry is not None and entry[0] is class_names:
+        return entry[1:]
+
+    n = max(class_names) + 1 if class_names else 0
+    visible = np.ones(n, dtype=bool)
+    colors = [CONTENT_BOX_COLOR] * n
+    liquid = [False] * n
+    for cls_id, label in class_names.items():
+        lbl = label.lower()
+        if vessel_model:
+            visible[cls_id] = show_label_vessel or lbl != "vessel"
+        else:
+            visible[cls_id] = class_label_is_visible(label)
+        if "vessel" in lbl:
+            colors[cls_id] = VESSEL_BOX_COLOR
+        liquid[cls_id] = is_liquid_label(label)
+    _class_table_cache[id(class_names)] = (class_names, visible, colors, liquid)
+    return visible, colors, liquid
+
+
+def annotations_visible(h_obj):
+    """
+    False if every vessel and content class is toggled off. Content boxes
+    are only searched inside vessels, so then nothing can be drawn at all.
+    """
+    _load_vision_libs()
+    v_visible = class_tables(h_obj.vial_model.names, vessel_model=True)[0]
+    c_visible = class_tables(h_obj.contents_model.names)[0]
+    return bool(v_visible.any() or c_visible.any())
+
+
+def invalidate_class_tables():
+    _class_table_cache.clear()
 
 
 def class_label_is_visible(label_name):
@@ -789,76 +1783,140 @@ def is_liquid_label(label):
     return label.lower().startswith("homo") or label.lower().startswith("hetero")
 
 
-def measure_liquid_overlay(frame, x1, y1, x2, y2, full_height, thr):
+# Liquid boxes are matched to the previous frames' boxes by IoU, so the
+# debounce state follows a box even when its coordinates jitter by a pixel
+TRACK_IOU_MATCH = 0.5
+TRACK_MAX_AGE = 3   # frames a track survives without being matched
+_tracks = {}        # track id -> [x1, y1, x2, y2, frames since last match]
+_next_track_id = 0
+
+
+def reset_tracks():
+    global _next_track_id
+    _tracks.clear()
+    debounce_map.clear()
+    _next_track_id = 0
+
+
+def age_tracks():
+    """
+    Start a new frame: age every track and forget tracks (and their
+    debounce state) that went unmatched for more than TRACK_MAX_AGE frames.
+    """
+    for track_id in list(_tracks):
+        track = _tracks[track_id]
+        track[4] += 1
+        if track[4] > TRACK_MAX_AGE:
+            del _tracks[track_id]
+            debounce_map.pop(track_id, None)
+
+
+def match_track(x1, y1, x2, y2):
+    """
+    Return the id of the track this box continues: the best IoU match
+    (>= TRACK_IOU_MATCH) among tracks not yet claimed this frame, or a
+    new id. Greedy, which is plenty for a handful of vessels.
+    """
+    global _next_track_id
+    best_id, best_iou = None, TRACK_IOU_MATCH
+    area = (x2 - x1) * (y2 - y1)
+    for track_id, (tx1, ty1, tx2, ty2, age) in _tracks.items():
+        if age == 0:
+            continue  # already matched this frame
+        iw = min(x2, tx2) - max(x1, tx1)
+        ih = min(y2, ty2) - max(y1, ty1)
+        if iw <= 0 or ih <= 0:
+            continue
+        inter = iw * ih
+        iou = inter / (area + (tx2 - tx1) * (ty2 - ty1) - inter)
+        if iou >= best_iou:
+            best_id, best_iou = track_id, iou
+    if best_id is None:
+        best_id = _next_track_id
+        _next_track_id += 1
+    _tracks[best_id] = [x1, y1, x2, y2, 0]
+    return best_id
+
+
+# Reused cvtColor output buffer for measure_liquid_overlay (grown as needed)
+_hsv_scratch = None
+
+
+def hsv_scratch(shape):
+    """
+    Return a contiguous uint8 array of `shape` backed by the shared HSV
+    scratch buffer, so converting each crop doesn't allocate a new image.
+    """
+    global _hsv_scratch
+    size = shape[0] * shape[1] * shape[2]
+    if _hsv_scratch is None or _hsv_scratch.size < size:
+        _hsv_scratch = np.empty(size, dtype=np.uint8)
+    return _hsv_scratch[:size].reshape(shape)
+
+
+# Crops with at most this many values (pixels x 3) are never subsampled
+TCV_SAMPLE_MIN_SIZE = 4096
+
+
+def measure_liquid_overlay(frame, x1, y1, x2, y2, full_height, settings, track_id=None):
+    """
+    Measure T/C/V for one liquid box and return its label suffix.
+    `settings` is the per-frame OverlaySettings from overlay_settings();
+    `track_id` (from match_track) selects the box's debounce state.
+    """
+    show_t, show_c, show_v, min_turb, min_col, min_vol, color_patch, debounce, stride, _ = settings
     cropped = frame[int(y1):int(y2), int(x1):int(x2)]
     if cropped.size == 0:
         return ""
-
-    hsv = cv2.cvtColor(cropped, cv2.COLOR_BGR2HSV)
-    avg_hue = np.mean(hsv[:, :, 0])   # 0..180
-    avg_val = np.mean(hsv[:, :, 2])   # 0..255 => turbidity
+    # Optional subsampling for the T/C averages (small boxes keep every pixel)
+    if stride > 1 and cropped.size > TCV_SAMPLE_MIN_SIZE:
+        cropped = cropped[::stride, ::stride]
+
+    if show_t or show_c or color_patch:
+        hsv = cv2.cvtColor(cropped, cv2.COLOR_BGR2HSV, dst=hsv_scratch(cropped.shape))
+        # One SIMD pass sums all three channels; the sums are exact integers,
+        # so this matches np.mean without strided per-channel passes
+        # (and is several times cheaper than cv2.mean here)
+        hue_sum, _, val_sum, _ = cv2.sumElems(hsv)
+        n_px = hsv.shape[0] * hsv.shape[1]
+        avg_hue = hue_sum / n_px   # 0..180
+        avg_val = val_sum / n_px   # 0..255 => turbidity
+    else:
+        # only V (box geometry) is shown: no pixel work needed
+        avg_hue = avg_val = 0.0
     box_height = (y2 - y1)
     vol_frac = box_height / full_height if full_height > 0 else 0
 
-    if show_color_patch:
+    if color_patch:
         draw_color_patch(frame, int(x2), int(y1), avg_hue)
 
-    # thresholds if any
-    min_turb, min_col, min_vol = 0, 0, 0
-    if thr:
-        min_turb, min_col, min_vol, _ = thr
-
-    do_show_t = (advanced_overlay and show_metric_t and (avg_val >= min_turb))
-    do_show_c = (advanced_overlay and show_metric_c and (avg_hue >= min_col))
-    do_show_v = (advanced_overlay and show_metric_v and (vol_frac >= min_vol))
+    do_show_t = (show_t and (avg_val >= min_turb))
+    do_show_c = (show_c and (avg_hue >= min_col))
+    do_show_v = (show_v and (vol_frac >= min_vol))
 
     # If no debouncing, just build text
-    if not debounce_enabled:
+    if not debounce:
         return build_label_str(avg_val, avg_hue, vol_frac, do_show_t, do_show_c, do_show_v)
 
-    # Debouncing with 3-frame rule
-    box_key = f"{x1}:{y1}:{x2}:{y2}"
-    if box_key not in debounce_map:
-        debounce_map[box_key] = {
-            'T': {'last_val': 0.0, 'zero_count': 3},
-            'C': {'last_val': 0.0, 'zero_count': 3},
-            'V': {'last_val': 0.0, 'zero_count': 3},
-        }
-
-    entry_t = debounce_map[box_key]['T']
-    entry_c = debounce_map[box_key]['C']
-    entry_v = debounce_map[box_key]['V']
-
-    # T
-    if do_show_t:
-        entry_t['zero_count'] = 0
-        entry_t['last_val'] = avg_val
-    else:
-        entry_t['zero_count'] += 1
-        if entry_t['zero_count'] >= 3:
-            entry_t['last_val'] = 0.0
-
-    # C
-    if do_show_c:
-        entry_c['zero_count'] = 0
-        entry_c['last_val'] = avg_hue
-    else:
-        entry_c['zero_count'] += 1
-        if entry_c['zero_count'] >= 3:
-            entry_c['last_val'] = 0.0
-
-    # V
-    if do_show_v:
-        entry_v['zero_count'] = 0
-        entry_v['last_val'] = vol_frac
-    else:
-        entry_v['zero_count'] += 1
-        if entry_v['zero_count'] >= 3:
-            entry_v['last_val'] = 0.0
+    # Debouncing with the DEBOUNCE_WINDOW-frame rule. Each tracked box keeps
+    # one flat state list: [last_T, last_C, last_V, zeros_T, zeros_C, zeros_V]
+    state = debounce_map.get(track_id)
+    if state is None:
+        state = [0.0, 0.0, 0.0, DEBOUNCE_WINDOW, DEBOUNCE_WINDOW, DEBOUNCE_WINDOW]
+        debounce_map[track_id] = state
+
+    shown = (do_show_t, do_show_c, do_show_v)
+    values = (avg_val, avg_hue, vol_frac)
+    for i in range(3):
+        if shown[i]:
+            state[3 + i] = 0
+            state[i] = values[i]
+        else:
+            state[3 + i] += 1
+            if state[3 + i] >= DEBOUNCE_WINDOW:
+                state[i] = 0.0
 
-    t_val = entry_t['last_val']
-    c_val = entry_c['last_val']
-    v_val = entry_v['last_val']
+    t_val, c_val, v_val = state[0], state[1], state[2]
 
     final_show_t = (t_val > 0.0)
     final_show_c = (c_val > 0.0)
@@ -878,11 +1936,20 @@ def build_label_str(turb, hue, vol, show_t, show_c, show_v):
     return ", ".join(parts)
 
 
+# BGR color of each OpenCV hue (0..180) at full saturation/value, as tuples
+_HUE_TO_BGR = None
+
+
 def draw_color_patch(frame, x_left, y_top, hue):
+    global _HUE_TO_BGR
+    if _HUE_TO_BGR is None:
+        # converted one pixel at a time on purpose: OpenCV's vectorised path
+        # for a whole row rounds some hues differently than a single pixel
+        _HUE_TO_BGR = [tuple(map(int, cv2.cvtColor(np.uint8([[[h, 255, 255]]]), cv2.COLOR_HSV2BGR)[0, 0]))
+                       for h in range(181)]
+
     patch_size = 20
-    color_hsv = np.uint8([[[hue, 255, 255]]])
-    color_bgr = cv2.cvtColor(color_hsv, cv2.COLOR_HSV2BGR)
-    b, g, r = int(color_bgr[0, 0, 0]), int(color_bgr[0, 0, 1]), int(color_bgr[0, 0, 2])
+    b, g, r = _HUE_TO_BGR[int(hue)]
 
     x2 = x_left + patch_size
     y2 = y_top + patch_size
@@ -898,23 +1965,39 @@ def combine_side_by_side(original, annotated):
 
 
 def draw_top_left_list(frame, box_lines, font_scale):
-    overlay = frame.copy()
+    # Draws in place; callers pass a frame they already own
     x, y = 10, 30
+    line_height = int(30 * font_scale + 10)
     for line in box_lines:
-        cv2.putText(overlay, line, (x, y), cv2.FONT_HERSHEY_SIMPLEX, font_scale,
-                    (255, 255, 255), 3, cv2.LINE_AA)
-        y += int(30 * font_scale + 10)
-    return overlay
+        cv2.putText(frame, line, (x, y), cv2.FONT_HERSHEY_SIMPLEX, font_scale,
+                    (255, 255, 255), 3, cv2.LINE_8)
+        y += line_height
+    return frame
+
+
+# Redraw the progress bar at most every PROGRESS_INTERVAL seconds
+PROGRESS_INTERVAL = 0.05
+PROGRESS_BAR_LEN = 50
+PROGRESS_FMT = "\rProcessing video frames: [%s] %d/%d"
+_last_progress_time = 0.0
+
+
+def reset_progress_bar():
+    global _last_progress_time
+    _last_progress_time = 0.0
 
 
 def progress_bar(current, total):
+    global _last_progress_time
     if total <= 0:
         return
-    bar_len = 50
-    frac = current / total
-    filled = int(bar_len * frac)
-    bar = "#" * filled + "-" * (bar_len - filled)
-    print(f"\rProcessing video frames: [{bar}] {current}/{total}", end="", flush=True)
+    now = time.monotonic()
+    if now - _last_progress_time < PROGRESS_INTERVAL and current < total:
+        return
+    _last_progress_time = now
+    filled = int(PROGRESS_BAR_LEN * current / total)
+    sys.stdout.write(PROGRESS_FMT % ("#" * filled + "-" * (PROGRESS_BAR_LEN - filled), current, total))
+    sys.stdout.flush()
 
 
 # =============================================================================
@@ -928,52 +2011,62 @@ def handle_display_config():
     # --- ADDED FOR CPU-ONLY TOGGLE ---
     global cpu_only_inference
 
-    print(ctext("\n=== Current Configuration ===", color=Fore.CYAN, style=Style.BRIGHT))
+    # Collect the whole report and write it once
+    lines = [ctext("\n=== Current Configuration ===", color=Fore.CYAN, style=Style.BRIGHT)]
     if heinsight_module_available:
-        print(ctext("HeinSight Import: AVAILABLE", color=Fore.GREEN))
+        lines.append(ctext("HeinSight Import: AVAILABLE", color=Fore.GREEN))
     else:
-        print(ctext("HeinSight Import: NOT AVAILABLE", color=Fore.RED))
+        lines.append(ctext("HeinSight Import: NOT AVAILABLE", color=Fore.RED))
 
-    print(f"HeinSight Directory: {heinsight_dir if heinsight_dir else '(none)'}")
+    lines.append(f"HeinSight Directory: {heinsight_dir if heinsight_dir else '(none)'}")
 
     if heinsight_obj is None:
-        print(ctext("YOLO Models: Not loaded or reloading needed.", color=Fore.RED))
+        lines.append(ctext("YOLO Models: Not loaded or reloading needed.", color=Fore.RED))
     else:
-        print(ctext("YOLO Models: Loaded", color=Fore.GREEN))
+        lines.append(ctext("YOLO Models: Loaded", color=Fore.GREEN))
 
     if thresholds is None:
-        print("Thresholds: (none) => all T/C/V displayed")
+        lines.append("Thresholds: (none) => all T/C/V displayed")
     else:
-        print(f"Thresholds: {thresholds}")
-
-    print(f"Input File: {input_file if input_file else '(none)'}")
-    print(f"Output Dir: {output_dir if output_dir else '(none)'}")
-
-    print(f"Advanced Overlay: {'ON' if advanced_overlay else 'OFF'}")
-    print(f"Auto-Open Output: {'ON' if auto_open_output else 'OFF'}")
-    print(f"Side-by-Side Output: {'ON' if side_by_side else 'OFF'}")
-    print(f"Annotation Font Scale: {annotation_font_scale}")
-    print(f"Top-Left List: {'ON' if show_top_left_list else 'OFF'}")
-    print(f"Color Patch for Hue: {'ON' if show_color_patch else 'OFF'}")
-    print(f"Debouncing for T/C/V: {'ON' if debounce_enabled else 'OFF'}")
+        lines.append(f"Thresholds: {thresholds}")
+
+    lines.append(f"Input File: {input_file if input_file else '(none)'}")
+    lines.append(f"Output Dir: {output_dir if output_dir else '(none)'}")
+
+    lines.append(f"Advanced Overlay: {ON_OFF[advanced_overlay]}")
+    lines.append(f"Auto-Open Output: {ON_OFF[auto_open_output]}")
+    lines.append(f"FFmpeg Video Backend: {ON_OFF[ffmpeg_backend]}")
+    lines.append(f"Side-by-Side Output: {ON_OFF[side_by_side]}")
+    lines.append(f"Annotation Font Scale: {annotation_font_scale}")
+    lines.append(f"Top-Left List: {ON_OFF[show_top_left_list]}")
+    lines.append(f"Color Patch for Hue: {ON_OFF[show_color_patch]}")
+    lines.append(f"Debouncing for T/C/V: {ON_OFF[debounce_enabled]}")
+    lines.append(f"Video Frame Stride: every {frame_stride} frame(s)")
+    lines.append(f"Video Detection Stride: every {detect_stride} frame(s)")
+    lines.append(f"T/C Pixel Sampling Stride: every {tcv_sample_stride} pixel(s)")
 
     # --- ADDED FOR CPU-ONLY TOGGLE ---
-    print(f"CPU Only Inference: {'ON' if cpu_only_inference else 'OFF'}")
+    lines.append(f"CPU Only Inference: {ON_OFF[cpu_only_inference]}")
+    lines.append(f"Video Inference Batch Size: {batch_size_label()}")
+    lines.append(f"TensorRT FP16 Engines: {ON_OFF[use_tensorrt_engines]}")
+    lines.append(f"Vessel Detector Input Size: {vessel_imgsz_label()}")
 
-    print(ctext("\n--- Class Label Visibility ---", color=Fore.CYAN))
-    print(f"Vessel: {'ON' if show_label_vessel else 'OFF'}")
-    print(f"Solid: {'ON' if show_label_solid else 'OFF'}")
-    print(f"Residue: {'ON' if show_label_residue else 'OFF'}")
-    print(f"Empty: {'ON' if show_label_empty else 'OFF'}")
-    print(f"Homo: {'ON' if show_label_homo else 'OFF'}")
-    print(f"Hetero: {'ON' if show_label_hetero else 'OFF'}")
+    lines.append(ctext("\n--- Class Label Visibility ---", color=Fore.CYAN))
+    lines.append(f"Vessel: {ON_OFF[show_label_vessel]}")
+    lines.append(f"Solid: {ON_OFF[show_label_solid]}")
+    lines.append(f"Residue: {ON_OFF[show_label_residue]}")
+    lines.append(f"Empty: {ON_OFF[show_label_empty]}")
+    lines.append(f"Homo: {ON_OFF[show_label_homo]}")
+    lines.append(f"Hetero: {ON_OFF[show_label_hetero]}")
 
-    print(ctext("--- Metric Visibility (T/C/V) ---", color=Fore.CYAN))
-    print(f"Turbidity (T): {'ON' if show_metric_t else 'OFF'}")
-    print(f"Color/Hue (C): {'ON' if show_metric_c else 'OFF'}")
-    print(f"Volume Fraction (V): {'ON' if show_metric_v else 'OFF'}")
+    lines.append(ctext("--- Metric Visibility (T/C/V) ---", color=Fore.CYAN))
+    lines.append(f"Turbidity (T): {ON_OFF[show_metric_t]}")
+    lines.append(f"Color/Hue (C): {ON_OFF[show_metric_c]}")
+    lines.append(f"Volume Fraction (V): {ON_OFF[show_metric_v]}")
 
-    print(ctext("================================", color=Fore.CYAN))
+    lines.append(ctext("================================", color=Fore.CYAN))
+    lines.append("")
+    sys.stdout.write("\n".join(lines))
 
 
 # =============================================================================
@@ -989,9 +2082,12 @@ def open_file_in_viewer(filepath):
     if os.name == "nt":
         os.startfile(filepath)
     else:
+        import subprocess
         try:
             opener = "open" if sys.platform == "darwin" else "xdg-open"
-            subprocess.run([opener, filepath])
+            # Don't wait for the opener: the menu comes back immediately
+            subprocess.Popen([opener, filepath], stdin=subprocess.DEVNULL,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         except Exception as e:
             print(ctext(f"Failed to open: {e}", color=Fore.RED))
 
@@ -1001,6 +2097,8 @@ def open_file_in_viewer(filepath):
 # =============================================================================
 
 if __name__ == "__main__":
+    # 0) Restore the folders the dialogs were last pointed at
+    load_dialog_state()
     # 1) Force the user to pick the 'heinsight4.0' folder
     enforce_heinsight_directory()
     # 2) Attempt to import HeinSight
@@ -0,0 +1,65 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import foresight
+
+
+class PassthroughMethodTest(unittest.TestCase):
+    """
+    passthrough_method() picks the copy/remux shortcut taken by
+    handle_run_detection when there is nothing to draw.
+    """
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(foresight, "side_by_side", False),
+            mock.patch.object(foresight, "frame_stride", 1),
+            mock.patch.object(foresight, "annotations_visible", return_value=False),
+            mock.patch.object(foresight, "ffmpeg_available", return_value=True),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def method(self, is_image=False, is_live=False, ext=".mp4"):
+        return foresight.passthrough_method(None, is_image, is_live, ext)
+
+    def test_png_image_is_copied(self):
+        self.assertEqual(self.method(is_image=True, ext=".PNG"), "copy")
+
+    def test_other_image_runs_detection(self):
+        self.assertIsNone(self.method(is_image=True, ext=".jpg"))
+
+    def test_video_is_remuxed_even_when_extension_matches(self):
+        self.assertEqual(self.method(ext=".mp4"), "remux")
+        self.assertEqual(self.method(ext=".avi"), "remux")
+
+    def test_video_without_ffmpeg_runs_detection(self):
+        with mock.patch.object(foresight, "ffmpeg_available", return_value=False):
+            self.assertIsNone(self.method(ext=".mp4"))
+
+    def test_live_source_runs_detection(self):
+        self.assertIsNone(self.method(is_live=True, ext=""))
+
+    def test_frame_stride_runs_detection_for_videos_only(self):
+        with mock.patch.object(foresight, "frame_stride", 2):
+            self.assertIsNone(self.method(ext=".mp4"))
+            self.assertEqual(self.method(is_image=True, ext=".png"), "copy")
+
+    def test_side_by_side_runs_detection(self):
+        with mock.patch.object(foresight, "side_by_side", True):
+            self.assertIsNone(self.method(ext=".mp4"))
+            self.assertIsNone(self.method(is_image=True, ext=".png"))
+
+    def test_visible_labels_run_detection(self):
+        with mock.patch.object(foresight, "annotations_visible", return_value=True):
+            self.assertIsNone(self.method(ext=".mp4"))
+            self.assertIsNone(self.method(is_image=True, ext=".png"))
+
+
+if __name__ == "__main__":
+    unittest.main()